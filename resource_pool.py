@@ -1,15 +1,29 @@
+import asyncio
+import inspect
+import itertools
+import time
 import typing
 
-from contextlib import contextmanager
-from queue import Queue, Empty, Full
-from typing import Generator, Generic, Optional, List
-from threading import Condition
+from collections import deque
+from typing import Any, Callable, Deque, Generic, Optional
+from threading import Condition, Lock
 
-__all__ = ["PoolError", "PoolTimeout", "PoolFull", "Pool", "LazyPool", "__version__"]
+__all__ = [
+    "PoolError", "PoolTimeout", "PoolFull",
+    "Pool", "SingleThreadedPool", "LazyPool", "AsyncPool", "AsyncLazyPool",
+    "__version__",
+]
 __version__ = "0.2.0"
 
 ResourceT = typing.TypeVar("ResourceT")
 ResourceFactory = typing.Callable[[], ResourceT]
+AsyncResourceFactory = typing.Callable[[], typing.Union[ResourceT, typing.Awaitable[ResourceT]]]
+
+# The orders in which pools can hand out their resources.
+_POLICIES = ("lifo", "fifo", "mostly-lifo")
+
+# How often (in gets) a "mostly-lifo" pool hands out its oldest resource.
+_ROTATE_EVERY = 1024
 
 
 class PoolError(Exception):
@@ -27,26 +41,108 @@ class PoolFull(PoolError):
     """
 
 
-class Pool(Generic[ResourceT]):
-    """A generic resource pool.
+def _make_pop(pool: Deque[ResourceT], policy: str) -> Callable[[], ResourceT]:
+    """Get the function that removes the next resource from a pool's
+    deque according to the given policy.
+    """
+    if policy == "lifo":
+        return pool.pop
+    elif policy == "fifo":
+        return pool.popleft
+    elif policy == "mostly-lifo":
+        counter = itertools.count(1)
+        pop, popleft = pool.pop, pool.popleft
 
-    Parameters:
-      factory: The factory function that is used to create resources.
-      pool_size: The max number of resources in the pool at any time.
+        def pop_mostly_lifo() -> ResourceT:
+            if next(counter) % _ROTATE_EVERY:
+                return pop()
+            return popleft()
+
+        return pop_mostly_lifo
+
+    raise ValueError("policy must be one of {}, not {!r}".format(", ".join(_POLICIES), policy))
+
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    """Get the point in time after which a wait with the given timeout
+    expires.
+    """
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _time_left(deadline: Optional[float]) -> Optional[float]:
+    """Get the number of seconds left until the given deadline.
+
+    Raises:
+      PoolTimeout: If the deadline has passed.
+    """
+    if deadline is None:
+        return None
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise PoolTimeout()
+    return remaining
+
+
+class _Reservation(Generic[ResourceT]):
+    """A context manager that reserves a resource on entry and puts it
+    back into its pool on exit.
+    """
+
+    __slots__ = ("_pool", "_timeout", "_resource")
+
+    def __init__(self, pool: Any, timeout: Optional[float]) -> None:
+        self._pool = pool
+        self._timeout = timeout
+
+    def __enter__(self) -> ResourceT:
+        self._resource = self._pool.get(timeout=self._timeout)
+        return self._resource
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._pool.put(self._resource)
+
+
+class _AsyncReservation(Generic[ResourceT]):
+    """An async context manager that reserves a resource on entry and
+    puts it back into its pool on exit.
+    """
+
+    __slots__ = ("_pool", "_timeout", "_resource")
+
+    def __init__(self, pool: Any, timeout: Optional[float]) -> None:
+        self._pool = pool
+        self._timeout = timeout
+
+    async def __aenter__(self) -> ResourceT:
+        self._resource = await self._pool.get(timeout=self._timeout)
+        return self._resource
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._pool.put(self._resource)
+
+
+class _BasePool(Generic[ResourceT]):
+    """The state and operations shared by the thread-safe pools.
     """
 
-    _pool: Queue
+    _cond: Condition
+    _pool: Deque[ResourceT]
     _pool_size: int
+    _pop: Callable[[], ResourceT]
+    _push: Callable[[ResourceT], None]
+    _waiters: int
 
-    def __init__(self, factory: ResourceFactory, *, pool_size: int) -> None:
-        self._pool = Queue(pool_size)
+    def __init__(self, *, pool_size: int, policy: str) -> None:
+        self._cond = Condition(Lock())
+        self._pool = deque()
         self._pool_size = pool_size
+        self._pop = _make_pop(self._pool, policy)
+        self._push = self._pool.append
+        self._waiters = 0
 
-        for _ in range(pool_size):
-            self.put(factory())
-
-    @contextmanager
-    def reserve(self, timeout: Optional[float] = None) -> Generator[ResourceT, None, None]:
+    def reserve(self, timeout: Optional[float] = None) -> "_Reservation[ResourceT]":
         """Reserve a resource and then put it back.
 
         Example:
@@ -63,11 +159,68 @@ class Pool(Generic[ResourceT]):
         Returns:
           A resource.
         """
-        resource = self.get(timeout=timeout)
+        return _Reservation(self, timeout)
+
+    def put(self, resource: ResourceT) -> None:
+        """Put a resource back.
+
+        Raises:
+          PoolFull: If the resource pool is full.
+        """
+        if not self.try_put(resource):
+            raise PoolFull()
+
+    def try_put(self, resource: ResourceT) -> bool:
+        """Put a resource back without raising if the pool is full.
+
+        Returns:
+          True if the resource was put back and False if the pool is full.
+        """
+        with self._cond:
+            if len(self._pool) == self._pool_size:
+                return False
+
+            self._push(resource)
+            if self._waiters:
+                self._cond.notify()
+            return True
+
+    def __len__(self) -> int:
+        """Get the number of resources currently in the pool.
+        """
+        return len(self._pool)
+
+    def _wait(self, deadline: Optional[float]) -> None:
+        """Wait until another thread notifies the condition.  Must be
+        called while holding the lock.
+
+        Raises:
+          PoolTimeout: If the deadline has passed.
+        """
+        remaining = _time_left(deadline)
+        self._waiters += 1
         try:
-            yield resource
+            self._cond.wait(remaining)
         finally:
-            self.put(resource)
+            self._waiters -= 1
+
+
+class Pool(_BasePool[ResourceT]):
+    """A generic resource pool.
+
+    Parameters:
+      factory: The factory function that is used to create resources.
+      pool_size: The max number of resources in the pool at any time.
+      policy: The order in which resources are handed out.  "lifo"
+        reuses the most recently returned resource first, "fifo" the
+        least recently returned one and "mostly-lifo" behaves like
+        "lifo" except it periodically hands out the oldest resource so
+        that none of them sit idle forever.
+    """
+
+    def __init__(self, factory: ResourceFactory, *, pool_size: int, policy: str = "lifo") -> None:
+        super().__init__(pool_size=pool_size, policy=policy)
+        self._pool.extend(factory() for _ in range(pool_size))
 
     def get(self, *, timeout: Optional[float] = None) -> ResourceT:
         """Get a resource from the pool.
@@ -82,61 +235,208 @@ class Pool(Generic[ResourceT]):
           timeout: An optional timeout representing how long to wait
             for the resource.
         """
-        try:
-            return self._pool.get(timeout=timeout)
-        except Empty:
-            raise PoolTimeout()
+        with self._cond:
+            if not self._pool:
+                deadline = _deadline(timeout)
+                while not self._pool:
+                    self._wait(deadline)
+            return self._pop()
 
-    def put(self, resource: ResourceT) -> None:
-        """Put a resource back.
+    def try_get(self) -> Optional[ResourceT]:
+        """Get a resource from the pool without waiting.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Returns:
+          A resource or None if none are available.
+        """
+        with self._cond:
+            if self._pool:
+                return self._pop()
+            return None
+
+
+class SingleThreadedPool(Pool[ResourceT]):
+    """A generic resource pool that skips all locking.
+
+    Use it in place of a Pool that is never shared between threads.
+    Since no other thread can put a resource back, getting a resource
+    from an empty pool fails immediately rather than waiting.
+
+    Parameters:
+      factory: The factory function that is used to create resources.
+      pool_size: The max number of resources in the pool at any time.
+      policy: The order in which resources are handed out.  See Pool.
+    """
+
+    def get(self, *, timeout: Optional[float] = None) -> ResourceT:
+        """Get a resource from the pool.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
 
         Raises:
-          PoolFull: If the resource pool is full.
+          Timeout: If the pool is empty.
+
+        Parameters:
+          timeout: Ignored.  Present for compatibility with Pool.
         """
-        try:
-            return self._pool.put_nowait(resource)
-        except Full:
-            raise PoolFull()
+        if not self._pool:
+            raise PoolTimeout()
+        return self._pop()
 
-    def __len__(self) -> int:
-        """Get the number of resources currently in the pool.
+    def try_get(self) -> Optional[ResourceT]:
+        """Get a resource from the pool without raising if it's empty.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Returns:
+          A resource or None if none are available.
         """
-        return self._pool.qsize()
+        if self._pool:
+            return self._pop()
+        return None
 
+    def try_put(self, resource: ResourceT) -> bool:
+        """Put a resource back without raising if the pool is full.
 
-class LazyPool(Generic[ResourceT]):
+        Returns:
+          True if the resource was put back and False if the pool is full.
+        """
+        if len(self._pool) == self._pool_size:
+            return False
+
+        self._push(resource)
+        return True
+
+
+class LazyPool(_BasePool[ResourceT]):
     """A generic resource pool that lazily creates resources.
 
     Parameters:
       factory: The factory function that is used to create resources.
       pool_size: The max number of resources in the pool at any time.
+      min_instances: The number of resources to create up front.
+      policy: The order in which resources are handed out.  See Pool.
     """
 
     _factory: ResourceFactory
-    _cond: Condition
-    _pool: List[ResourceT]
-    _pool_size: int
     _used_size: int
 
-    def __init__(self, factory: ResourceFactory, *, pool_size: int, min_instances: int = 0) -> None:
+    def __init__(
+            self, factory: ResourceFactory, *,
+            pool_size: int, min_instances: int = 0, policy: str = "lifo",
+    ) -> None:
         assert pool_size > min_instances, "pool_size must be larger than min_instances"
 
+        super().__init__(pool_size=pool_size, policy=policy)
         self._factory = factory
-        self._cond = Condition()
-        self._pool = []
-        self._pool_size = pool_size
-        self._used_size = 0
+        self._used_size = min_instances
+        self._pool.extend(factory() for _ in range(min_instances))
+
+    def get(self, *, timeout: Optional[float] = None) -> ResourceT:
+        """Get a resource from the pool.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Raises:
+          Timeout: If a timeout is given and it expires.
+
+        Parameters:
+          timeout: An optional timeout representing how long to wait
+            for the resource.
+        """
+        with self._cond:
+            if not self._pool and self._used_size == self._pool_size:
+                deadline = _deadline(timeout)
+                while not self._pool and self._used_size == self._pool_size:
+                    self._wait(deadline)
+
+            if self._pool:
+                return self._pop()
 
-        for _ in range(min_instances):
             self._used_size += 1
-            self.put(factory())
 
-    @contextmanager
-    def reserve(self, timeout: Optional[float] = None) -> Generator[ResourceT, None, None]:
+        return self._create()
+
+    def try_get(self) -> Optional[ResourceT]:
+        """Get a resource from the pool without waiting, creating one
+        if there's room for it.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Returns:
+          A resource or None if none are available.
+        """
+        with self._cond:
+            if self._pool:
+                return self._pop()
+
+            if self._used_size == self._pool_size:
+                return None
+
+            self._used_size += 1
+
+        return self._create()
+
+    def discard(self, resource: ResourceT) -> None:
+        """Discard a resource from the pool.
+        """
+        with self._cond:
+            self._used_size = max(0, self._used_size - 1)
+            if self._waiters:
+                self._cond.notify()
+
+    def _create(self) -> ResourceT:
+        """Create a new resource for a slot that has already been
+        accounted for in _used_size.
+
+        This is called without holding the lock so that slow factories
+        don't block other threads from getting or putting resources.
+        """
+        try:
+            return self._factory()
+        except BaseException:
+            with self._cond:
+                self._used_size -= 1
+                if self._waiters:
+                    self._cond.notify()
+            raise
+
+
+class _AsyncBasePool(Generic[ResourceT]):
+    """The state and operations shared by the asyncio pools.
+
+    Their condition is created on first use rather than up front so
+    that, on Python versions before 3.10, it binds to the event loop
+    the pool is used from rather than whichever loop was current when
+    the pool was created.
+    """
+
+    _cond: Optional[asyncio.Condition]
+    _pool: Deque[ResourceT]
+    _pool_size: int
+    _pop: Callable[[], ResourceT]
+    _push: Callable[[ResourceT], None]
+    _waiters: int
+
+    def __init__(self, *, pool_size: int, policy: str) -> None:
+        self._cond = None
+        self._pool = deque()
+        self._pool_size = pool_size
+        self._pop = _make_pop(self._pool, policy)
+        self._push = self._pool.append
+        self._waiters = 0
+
+    def reserve(self, timeout: Optional[float] = None) -> "_AsyncReservation[ResourceT]":
         """Reserve a resource and then put it back.
 
         Example:
-          with pool.reserve(timeout=10) as res:
+          async with pool.reserve(timeout=10) as res:
             print(res)
 
         Raises:
@@ -149,13 +449,76 @@ class LazyPool(Generic[ResourceT]):
         Returns:
           A resource.
         """
-        resource = self.get(timeout=timeout)
+        return _AsyncReservation(self, timeout)
+
+    async def put(self, resource: ResourceT) -> None:
+        """Put a resource back.
+
+        Raises:
+          PoolFull: If the resource pool is full.
+        """
+        if not await self.try_put(resource):
+            raise PoolFull()
+
+    async def try_put(self, resource: ResourceT) -> bool:
+        """Put a resource back without raising if the pool is full.
+
+        Returns:
+          True if the resource was put back and False if the pool is full.
+        """
+        cond = self._condition()
+        async with cond:
+            if len(self._pool) == self._pool_size:
+                return False
+
+            self._push(resource)
+            if self._waiters:
+                cond.notify()
+            return True
+
+    def __len__(self) -> int:
+        """Get the number of resources currently in the pool.
+        """
+        return len(self._pool)
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def _wait(self, deadline: Optional[float]) -> None:
+        """Wait until another task notifies the condition.  Must be
+        called while holding the lock.
+
+        Raises:
+          PoolTimeout: If the deadline has passed.
+        """
+        remaining = _time_left(deadline)
+        self._waiters += 1
         try:
-            yield resource
+            await asyncio.wait_for(self._condition().wait(), remaining)
+        except asyncio.TimeoutError:
+            pass
         finally:
-            self.put(resource)
+            self._waiters -= 1
 
-    def get(self, *, timeout: Optional[float] = None) -> ResourceT:
+
+class AsyncPool(_AsyncBasePool[ResourceT]):
+    """A generic resource pool for use from asyncio code.
+
+    Instances must only be used from a single event loop.
+
+    Parameters:
+      factory: The factory function that is used to create resources.
+      pool_size: The max number of resources in the pool at any time.
+      policy: The order in which resources are handed out.  See Pool.
+    """
+
+    def __init__(self, factory: ResourceFactory, *, pool_size: int, policy: str = "lifo") -> None:
+        super().__init__(pool_size=pool_size, policy=policy)
+        self._pool.extend(factory() for _ in range(pool_size))
+
+    async def get(self, *, timeout: Optional[float] = None) -> ResourceT:
         """Get a resource from the pool.
 
         It's the getter's responsibility to put the resource back once
@@ -168,37 +531,120 @@ class LazyPool(Generic[ResourceT]):
           timeout: An optional timeout representing how long to wait
             for the resource.
         """
-        with self._cond:
-            while not self._pool:
-                if self._used_size != self._pool_size:
-                    self._used_size += 1
-                    return self._factory()
+        async with self._condition():
+            if not self._pool:
+                deadline = _deadline(timeout)
+                while not self._pool:
+                    await self._wait(deadline)
+            return self._pop()
 
-                if not self._cond.wait(timeout):
-                    raise PoolTimeout()
-            return self._pool.pop()
+    async def try_get(self) -> Optional[ResourceT]:
+        """Get a resource from the pool without waiting.
 
-    def put(self, resource: ResourceT) -> None:
-        """Put a resource back.
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Returns:
+          A resource or None if none are available.
+        """
+        async with self._condition():
+            if self._pool:
+                return self._pop()
+            return None
+
+
+class AsyncLazyPool(_AsyncBasePool[ResourceT]):
+    """A generic resource pool for use from asyncio code that lazily
+    creates resources.
+
+    Instances must only be used from a single event loop.  Unlike
+    LazyPool, it can't create resources up front because its factory
+    may need to be awaited.
+
+    Parameters:
+      factory: The factory function that is used to create resources.
+        It may return an awaitable, in which case it is awaited.
+      pool_size: The max number of resources in the pool at any time.
+      policy: The order in which resources are handed out.  See Pool.
+    """
+
+    _factory: AsyncResourceFactory
+    _used_size: int
+
+    def __init__(self, factory: AsyncResourceFactory, *, pool_size: int, policy: str = "lifo") -> None:
+        super().__init__(pool_size=pool_size, policy=policy)
+        self._factory = factory
+        self._used_size = 0
+
+    async def get(self, *, timeout: Optional[float] = None) -> ResourceT:
+        """Get a resource from the pool.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
 
         Raises:
-          PoolFull: If the resource pool is full.
+          Timeout: If a timeout is given and it expires.
+
+        Parameters:
+          timeout: An optional timeout representing how long to wait
+            for the resource.
         """
-        with self._cond:
-            if len(self._pool) == self._pool_size:
-                raise PoolFull()
+        async with self._condition():
+            if not self._pool and self._used_size == self._pool_size:
+                deadline = _deadline(timeout)
+                while not self._pool and self._used_size == self._pool_size:
+                    await self._wait(deadline)
 
-            self._pool.append(resource)
-            self._cond.notify()
+            if self._pool:
+                return self._pop()
 
-    def discard(self, resource: ResourceT) -> None:
+            self._used_size += 1
+
+        return await self._create()
+
+    async def try_get(self) -> Optional[ResourceT]:
+        """Get a resource from the pool without waiting, creating one
+        if there's room for it.
+
+        It's the getter's responsibility to put the resource back once
+        they're done using it.
+
+        Returns:
+          A resource or None if none are available.
+        """
+        async with self._condition():
+            if self._pool:
+                return self._pop()
+
+            if self._used_size == self._pool_size:
+                return None
+
+            self._used_size += 1
+
+        return await self._create()
+
+    async def discard(self, resource: ResourceT) -> None:
         """Discard a resource from the pool.
         """
-        with self._cond:
+        cond = self._condition()
+        async with cond:
             self._used_size = max(0, self._used_size - 1)
-            self._cond.notify()
+            if self._waiters:
+                cond.notify()
 
-    def __len__(self) -> int:
-        """Get the number of resources currently in the pool.
+    async def _create(self) -> ResourceT:
+        """See LazyPool._create.  The factory's result is awaited if
+        it's awaitable.
         """
-        return len(self._pool)
+        try:
+            resource = self._factory()
+            if inspect.isawaitable(resource):
+                resource = await resource
+            return resource
+        except BaseException:
+            cond = self._condition()
+            async with cond:
+                self._used_size -= 1
+                if self._waiters:
+                    cond.notify()
+            raise
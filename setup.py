@@ -37,6 +37,6 @@ setup(
             "twine",
         ],
     },
-    python_requires=">=3.5",
+    python_requires=">=3.8",
     include_package_data=True,
 )
@@ -1,11 +1,13 @@
+import asyncio
 import pytest
+import threading
 import time
 
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
-from resource_pool import LazyPool, Pool, PoolTimeout, PoolFull
+from resource_pool import AsyncLazyPool, AsyncPool, LazyPool, Pool, PoolTimeout, PoolFull, SingleThreadedPool
 
 
-@pytest.mark.parametrize("pool_class", [Pool, LazyPool])
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
 def test_can_reserve_elements_from_a_pool(pool_class):
     # Given that I have a resource pool
     pool = pool_class(lambda: {"test": 42}, pool_size=32)
@@ -22,7 +24,7 @@ def test_can_reserve_elements_from_a_pool(pool_class):
     assert len(pool) == pool_size + 1
 
 
-@pytest.mark.parametrize("pool_class", [Pool, LazyPool])
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
 def test_resources_get_put_back_on_error(pool_class):
     # Given that I have a resource pool
     pool = pool_class(lambda: {"test": 42}, pool_size=32)
@@ -41,7 +43,29 @@ def test_resources_get_put_back_on_error(pool_class):
     assert len(pool) == pool_size + 1
 
 
-@pytest.mark.parametrize("pool_class", [Pool, LazyPool])
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
+def test_reservations_only_take_resources_once_entered(pool_class):
+    # Given that I have a resource pool of one element
+    pool = pool_class(lambda: {}, pool_size=1)
+    pool.put(pool.get())
+
+    # When I create a reservation without entering it
+    reservation = pool.reserve()
+
+    # Then the resource should still be in the pool
+    assert len(pool) == 1
+
+    # When I enter the reservation
+    with reservation:
+        # Then the resource should be taken out of the pool
+        assert len(pool) == 0
+
+    # When I exit the reserve block
+    # Then the resource should get put back
+    assert len(pool) == 1
+
+
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
 def test_get_can_timeout(pool_class):
     # Given that I have a resource pool of one element
     pool = pool_class(lambda: {}, pool_size=1)
@@ -55,7 +79,59 @@ def test_get_can_timeout(pool_class):
         pool.get(timeout=0.1)
 
 
+def test_single_threaded_pools_dont_block_when_empty():
+    # Given that I have a single-threaded resource pool of one element
+    pool = SingleThreadedPool(lambda: {}, pool_size=1)
+
+    # When I take that element out
+    pool.get()
+
+    # And try to get another one without a timeout
+    errors = []
+
+    def get():
+        try:
+            pool.get()
+        except PoolTimeout as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=get, daemon=True)
+    thread.start()
+    thread.join(timeout=1)
+
+    # Then a PoolTimeout should be raised straight away
+    assert not thread.is_alive()
+    assert len(errors) == 1
+
+
 @pytest.mark.parametrize("pool_class", [Pool, LazyPool])
+def test_get_timeouts_are_not_extended_by_wakeups(pool_class):
+    # Given that I have a resource pool of one element
+    pool = pool_class(lambda: {}, pool_size=1)
+
+    # And I've taken that element out
+    pool.get()
+
+    # And some other thread wakes up every waiter half way through the timeout without putting anything back
+    def wake_waiters():
+        with pool._cond:
+            pool._cond.notify_all()
+
+    timer = threading.Timer(0.25, wake_waiters)
+    timer.start()
+
+    # When I try to get another element
+    # Then a PoolTimeout should be raised
+    start = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.get(timeout=0.5)
+
+    # And it should be raised close to the original deadline
+    assert time.monotonic() - start < 0.7
+    timer.join()
+
+
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
 def test_pools_can_be_full(pool_class):
     # Given that I have a resource pool of one element
     pool = pool_class(lambda: {}, pool_size=1)
@@ -70,6 +146,88 @@ def test_pools_can_be_full(pool_class):
         pool.put({})
 
 
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
+def test_try_get_returns_none_when_no_resources_are_available(pool_class):
+    # Given that I have a resource pool of one element
+    pool = pool_class(lambda: {}, pool_size=1)
+
+    # When I try to get an element without waiting
+    # Then I should get back a resource
+    d = pool.try_get()
+    assert d == {}
+
+    # When I try to get another one
+    # Then I should get back None
+    assert pool.try_get() is None
+
+
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
+def test_try_put_returns_false_when_the_pool_is_full(pool_class):
+    # Given that I have a resource pool of one element
+    pool = pool_class(lambda: {}, pool_size=1)
+
+    # When I take that element out
+    d = pool.get()
+
+    # And I try to put it back
+    # Then I should get back True
+    assert pool.try_put(d)
+
+    # When I try to put another element even though the pool is full
+    # Then I should get back False
+    assert not pool.try_put({})
+    assert len(pool) == 1
+
+
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool])
+@pytest.mark.parametrize("policy,expected", [
+    ("lifo", [3, 2, 1]),
+    ("fifo", [1, 2, 3]),
+    ("mostly-lifo", [3, 2, 1]),
+])
+def test_pools_hand_out_resources_according_to_their_policy(pool_class, policy, expected):
+    # Given that I have a resource pool with the given policy
+    pool = pool_class(dict, pool_size=3, policy=policy)
+
+    # And I've drained it and put three resources back in order
+    for _ in range(3):
+        pool.get()
+    for i in range(1, 4):
+        pool.put({"id": i})
+
+    # When I get three resources back out
+    # Then they should come out in the order dictated by the policy
+    assert [pool.get(timeout=0)["id"] for _ in range(3)] == expected
+
+
+@pytest.mark.parametrize("pool_class", [Pool, SingleThreadedPool, LazyPool, AsyncPool, AsyncLazyPool])
+def test_pools_reject_unknown_policies(pool_class):
+    # When I try to create a pool with a policy that doesn't exist
+    # Then a ValueError should be raised
+    with pytest.raises(ValueError):
+        pool_class(dict, pool_size=1, policy="LIFO")
+
+
+def test_mostly_lifo_pools_periodically_hand_out_their_oldest_resource():
+    # Given that I have a mostly-lifo pool of two elements
+    pool = Pool(dict, pool_size=2, policy="mostly-lifo")
+    oldest, newest = pool.get(), pool.get()
+    pool.put(oldest)
+    pool.put(newest)
+
+    # When I reserve and release elements many times
+    seen = []
+    for _ in range(1024):
+        with pool.reserve() as d:
+            seen.append(d)
+
+    # Then I should mostly get back the newest resource
+    assert seen[:-1] == [newest] * 1023
+
+    # And occasionally get back the oldest one
+    assert seen[-1] is oldest
+
+
 def test_can_reserve_elements_from_a_lazy_pool():
     # Given that I have a lazy resource pool with a factory that counts its number of instances
     instances = 0
@@ -131,8 +289,9 @@ def test_lazy_pools_can_preload_resources():
         assert len(pool) == instances - 1
 
 
-def test_lazy_pools_can_block():
-    # Given that I have a lazy resource pool with a factory that counts its number of instances
+@pytest.mark.parametrize("pool_class", [Pool, LazyPool])
+def test_pools_can_block(pool_class):
+    # Given that I have a resource pool with a factory that counts its number of instances
     instances = 0
 
     def factory():
@@ -140,7 +299,7 @@ def test_lazy_pools_can_block():
         instances += 1
         return {"test": 42}
 
-    pool = LazyPool(factory, pool_size=4)
+    pool = pool_class(factory, pool_size=4)
 
     # When I try to reserve 32 resources concurrently
     with ThreadPoolExecutor(max_workers=32) as e:
@@ -197,3 +356,292 @@ def test_lazy_pools_can_discard_resources():
         assert d2
         assert d2 == d1
         assert d2 is not d1
+
+
+def test_lazy_pools_release_capacity_when_the_factory_fails():
+    # Given that I have a lazy resource pool of one element whose factory fails the first time it's called
+    calls = 0
+
+    def factory():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("failed to create resource")
+        return {"test": 42}
+
+    pool = LazyPool(factory, pool_size=1)
+
+    # When I try to get a resource
+    # Then the factory's error should propagate
+    with pytest.raises(RuntimeError):
+        pool.get(timeout=0)
+
+    # When I try to get a resource again
+    # Then I should get back a resource
+    assert pool.get(timeout=0) == {"test": 42}
+
+
+def test_lazy_pools_dont_block_while_creating_resources():
+    # Given that I have a lazy resource pool with a factory that blocks until it's told to continue
+    started, proceed = threading.Event(), threading.Event()
+
+    def factory():
+        started.set()
+        proceed.wait()
+        return {"test": 42}
+
+    pool = LazyPool(factory, pool_size=2)
+
+    def put_and_get():
+        pool.put({"test": 0})
+        return pool.get(timeout=0)
+
+    with ThreadPoolExecutor(max_workers=2) as e:
+        try:
+            # When one thread starts creating a resource
+            future = e.submit(pool.get)
+            assert started.wait(timeout=10)
+
+            # Then other threads should still be able to put resources and get them back out
+            assert e.submit(put_and_get).result(timeout=1) == {"test": 0}
+        finally:
+            proceed.set()
+
+        assert future.result(timeout=10) == {"test": 42}
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_can_reserve_elements_from_an_async_pool(pool_class):
+    async def main():
+        # Given that I have an async resource pool
+        pool = pool_class(lambda: {"test": 42}, pool_size=32)
+
+        # When I try to reserve an element
+        async with pool.reserve() as d:
+            pool_size = len(pool)
+
+            # Then I should get back a resource
+            assert d == {"test": 42}
+
+        # When I exit the reserve block
+        # Then the resource should get put back
+        assert len(pool) == pool_size + 1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_async_get_can_timeout(pool_class):
+    async def main():
+        # Given that I have an async resource pool of one element
+        pool = pool_class(lambda: {}, pool_size=1)
+
+        # When I take that element out
+        await pool.get()
+
+        # And try to get another one
+        # Then a PoolTimeout should be raised
+        with pytest.raises(PoolTimeout):
+            await pool.get(timeout=0.1)
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_async_pools_can_be_full(pool_class):
+    async def main():
+        # Given that I have an async resource pool of one element
+        pool = pool_class(lambda: {}, pool_size=1)
+
+        # And I've reserved and released one element so as to make sure the lazy pool instantiates it
+        async with pool.reserve():
+            pass
+
+        # When I try to put an element back even though it is full
+        # Then a PoolFull should be raised
+        with pytest.raises(PoolFull):
+            await pool.put({})
+
+    asyncio.run(main())
+
+
+def test_async_lazy_pools_can_block():
+    # Given that I have an async lazy resource pool with an async factory that counts its number of instances
+    instances = 0
+
+    async def factory():
+        nonlocal instances
+        instances += 1
+        return {"test": 42}
+
+    async def main():
+        pool = AsyncLazyPool(factory, pool_size=4)
+        reserved = 0
+
+        async def background_job():
+            nonlocal reserved
+            async with pool.reserve(timeout=10):
+                reserved += 1
+                await asyncio.sleep(0.1)
+
+        # When I try to reserve 32 resources concurrently
+        await asyncio.gather(*[background_job() for _ in range(32)])
+
+        # Then the number of reserved instances should be 32
+        assert reserved == 32
+
+    asyncio.run(main())
+
+    # And the number of instances should be 4
+    assert instances == 4
+
+
+def test_async_lazy_pools_can_discard_resources():
+    async def main():
+        # Given that I have an async lazy resource pool of one element
+        pool = AsyncLazyPool(lambda: {"test": 42}, pool_size=1)
+
+        # When I try to reserve an element
+        d1 = await pool.get()
+
+        # And I try to get another resource from the pool
+        task = asyncio.ensure_future(pool.get(timeout=10))
+
+        # Then the task should be blocked
+        await asyncio.sleep(0.1)
+        assert not task.done()
+
+        # When I discard that resource
+        await pool.discard(d1)
+
+        # Then the task should be unblocked
+        d2 = await task
+        assert d2 == d1
+        assert d2 is not d1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_async_try_get_and_try_put_dont_raise(pool_class):
+    async def main():
+        # Given that I have an async resource pool of one element
+        pool = pool_class(lambda: {}, pool_size=1)
+
+        # When I try to get an element without waiting
+        # Then I should get back a resource
+        d = await pool.try_get()
+        assert d == {}
+
+        # When I try to get another one
+        # Then I should get back None
+        assert await pool.try_get() is None
+
+        # When I put the element back
+        # Then I should get back True
+        assert await pool.try_put(d)
+
+        # When I try to put another element even though the pool is full
+        # Then I should get back False
+        assert not await pool.try_put({})
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_async_pools_can_be_created_outside_of_the_event_loop(pool_class):
+    # Given that I have an async resource pool of one element that was created outside of any event loop
+    pool = pool_class(lambda: {}, pool_size=1)
+
+    async def main():
+        async def background_job():
+            async with pool.reserve(timeout=10):
+                await asyncio.sleep(0.01)
+
+        # When I reserve its element from two tasks at the same time
+        # Then both reservations should succeed
+        await asyncio.gather(background_job(), background_job())
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("pool_class", [AsyncPool, AsyncLazyPool])
+def test_cancelling_a_blocked_async_get_releases_the_pool(pool_class):
+    async def main():
+        # Given that I have an async resource pool of one element
+        pool = pool_class(lambda: {}, pool_size=1)
+
+        # And I've taken that element out
+        d = await pool.get()
+
+        # And another task is blocked trying to get an element
+        task = asyncio.ensure_future(pool.get(timeout=5))
+        await asyncio.sleep(0.05)
+
+        # When that task is cancelled
+        task.cancel()
+
+        # Then it should raise CancelledError
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # And the pool should remain usable
+        await asyncio.wait_for(pool.put(d), timeout=1)
+        assert await asyncio.wait_for(pool.get(), timeout=1) is d
+
+    asyncio.run(main())
+
+
+def test_async_lazy_pools_release_capacity_when_the_factory_fails():
+    # Given that I have an async lazy resource pool of one element whose factory fails the first time it's called
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("failed to create resource")
+        return {"test": 42}
+
+    async def main():
+        pool = AsyncLazyPool(factory, pool_size=1)
+
+        # When I try to get a resource
+        # Then the factory's error should propagate
+        with pytest.raises(RuntimeError):
+            await pool.get(timeout=0)
+
+        # When I try to get a resource again
+        # Then I should get back a resource
+        assert await pool.get(timeout=0) == {"test": 42}
+
+    asyncio.run(main())
+
+
+def test_async_lazy_pools_release_capacity_when_the_factory_is_cancelled():
+    # Given that I have an async lazy resource pool of one element whose factory blocks the first time it's called
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(10)
+        return {"test": 42}
+
+    async def main():
+        pool = AsyncLazyPool(factory, pool_size=1)
+
+        # When a task that is creating a resource gets cancelled
+        task = asyncio.ensure_future(pool.get())
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        # Then it should raise CancelledError
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # And I should still be able to get a resource
+        assert await pool.get(timeout=1) == {"test": 42}
+
+    asyncio.run(main())